@@ -30,7 +30,8 @@ class CoderAgent(Agent):
         
         Args:
             input_data: Dict with 'command' and 'steps' from reasoning agent
-            context: Optional context (file path, existing code, language, etc.)
+            context: Optional context (file path, existing code, language,
+                on_token callback for streamed output, etc.)
             
         Returns:
             AgentResult with generated code
@@ -57,7 +58,10 @@ class CoderAgent(Agent):
             codegen_tool = self.tools[0]
             
             prompt = self._build_codegen_prompt(command, steps, context)
-            result = codegen_tool.call(prompt)
+            
+            # Stream partial output to the caller if it passed a callback
+            on_token = context.get("on_token") if context else None
+            result = codegen_tool.call(prompt, on_token=on_token)
             
             if not result.success:
                 return AgentResult(
@@ -88,7 +92,8 @@ class CoderAgent(Agent):
                 metadata={
                     "agent": self.name,
                     "tool_used": codegen_tool.name,
-                    "formatted": len(self.tools) > 1
+                    "formatted": len(self.tools) > 1,
+                    "tokens": result.metadata.get("tokens")
                 }
             )
             
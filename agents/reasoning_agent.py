@@ -42,6 +42,7 @@ class ReasoningAgent(Agent):
         """
         try:
             command = str(input_data).strip()
+            token_estimate = None
             
             if not self.tools:
                 # Fallback to simple parsing if no LLM tool
@@ -61,13 +62,19 @@ class ReasoningAgent(Agent):
                     )
                 
                 steps = self._parse_plan(result.output)
+                token_estimate = result.metadata.get("tokens")
+            
+            if token_estimate is None:
+                # Rough estimate (1 token ≈ 4 characters) without serializing the plan
+                token_estimate = (len(command) + sum(len(step) for step in steps)) // 4
             
             return AgentResult(
                 success=True,
                 data={
                     "command": command,
                     "steps": steps,
-                    "step_count": len(steps)
+                    "step_count": len(steps),
+                    "token_estimate": token_estimate
                 },
                 metadata={
                     "agent": self.name,
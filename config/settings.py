@@ -22,6 +22,9 @@ class Settings:
     
     # Gemini
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    # "rest" goes through the (eventlet-patched) socket module, so a pending
+    # request yields to other clients; gRPC blocks the whole event loop
+    GEMINI_TRANSPORT: str = os.getenv("GEMINI_TRANSPORT", "rest")
     
     # LLM Configuration
     LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "gemini")
@@ -29,6 +32,8 @@ class Settings:
     
     # Speech-to-Text
     STT_PROVIDER: str = os.getenv("STT_PROVIDER", "google")
+    # Same trade-off as GEMINI_TRANSPORT, for the Google Cloud Speech client
+    GOOGLE_STT_TRANSPORT: str = os.getenv("GOOGLE_STT_TRANSPORT", "rest")
     
     # Security
     ENABLE_SANITIZER: bool = os.getenv("ENABLE_SANITIZER", "true").lower() == "true"
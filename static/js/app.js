@@ -1,4 +1,12 @@
 // Voice First IDE - Main Application
+
+// Binary assets are opened as raw files (/api/file/raw) instead of in the editor.
+// Keep in sync with _RAW_INLINE_EXTENSIONS in web_ide.py, the only types it serves inline
+const RAW_FILE_EXTENSIONS = new Set([
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'ico', 'bmp', 'pdf',
+    'mp3', 'wav', 'ogg', 'mp4', 'webm', 'zip', 'woff', 'woff2', 'ttf'
+]);
+
 class VoiceFirstIDE {
     constructor() {
         this.socket = null;
@@ -64,12 +72,28 @@ class VoiceFirstIDE {
         });
         
         this.socket.on('agent_error', (data) => {
+            this.streamedChars = 0;
             this.updateAgentStatus(data.stage, 'error', data.error);
             this.addMessage('assistant', `❌ Error in ${data.stage}: ${data.error}`);
             this.resetAgentStatus();
         });
         
+        this.socket.on('pipeline_progress', (updates) => {
+            // Batched pipeline events - run each through its regular handler, in order
+            updates.forEach(({event, data}) => {
+                this.socket.listeners(event).forEach(handler => handler(data));
+            });
+        });
+        
+        this.socket.on('code_chunk', (data) => {
+            // Live progress while the coder agent streams its output
+            this.streamedChars = (this.streamedChars || 0) + data.t.length;
+            const badge = document.querySelector('.status-item[data-stage="coding"] .status-badge');
+            if (badge) badge.textContent = `${this.streamedChars} chars`;
+        });
+        
         this.socket.on('code_generated', (data) => {
+            this.streamedChars = 0;
             this.addMessage('assistant', `✅ Code generated successfully! (${data.code.length} characters)`);
             
             // Store generated code and metadata
@@ -130,7 +154,7 @@ class VoiceFirstIDE {
     
     async loadFileTree() {
         try {
-            const response = await fetch('/api/workspace/files');
+            const response = await fetch('/api/workspace/files?depth=1');
             const data = await response.json();
             
             if (data.success) {
@@ -144,6 +168,36 @@ class VoiceFirstIDE {
         }
     }
     
+    async loadDirectory(path) {
+        try {
+            const response = await fetch(`/api/workspace/files?path=${encodeURIComponent(path)}&depth=1`);
+            const data = await response.json();
+            
+            if (data.success) {
+                return data.tree;
+            }
+            this.addMessage('assistant', `❌ Failed to load folder: ${data.error}`);
+        } catch (error) {
+            console.error('Failed to load folder:', error);
+        }
+        return [];
+    }
+    
+    async loadMoreEntries(item) {
+        try {
+            const response = await fetch(`/api/workspace/dir?path=${encodeURIComponent(item.path)}&offset=${item.offset}&sort=${item.sort === false ? 0 : 1}`);
+            const data = await response.json();
+            
+            if (data.success) {
+                return data.entries;
+            }
+            this.addMessage('assistant', `❌ Failed to load folder: ${data.error}`);
+        } catch (error) {
+            console.error('Failed to load more entries:', error);
+        }
+        return null;
+    }
+    
     renderFileTree(tree, container = null) {
         const fileTreeEl = container || document.getElementById('fileTree');
         
@@ -165,8 +219,23 @@ class VoiceFirstIDE {
                 childrenEl.className = 'folder-children';
                 childrenEl.style.display = 'none';
                 
-                folderEl.addEventListener('click', (e) => {
+                folderEl.addEventListener('click', async (e) => {
                     e.stopPropagation();
+                    
+                    // Ignore clicks while this folder's first load is in flight
+                    if (item.loading) return;
+                    
+                    // Children not loaded yet - fetch this level on first expand
+                    if (item.children === null) {
+                        item.loading = true;
+                        try {
+                            item.children = await this.loadDirectory(item.path);
+                        } finally {
+                            item.loading = false;
+                        }
+                        this.renderFileTree(item.children, childrenEl);
+                    }
+                    
                     folderEl.classList.toggle('expanded');
                     childrenEl.style.display = childrenEl.style.display === 'none' ? 'block' : 'none';
                 });
@@ -177,6 +246,33 @@ class VoiceFirstIDE {
                 if (item.children && item.children.length > 0) {
                     this.renderFileTree(item.children, childrenEl);
                 }
+            } else if (item.type === 'truncated') {
+                // Large directory - the server sent one page, fetch the next on click
+                const moreEl = document.createElement('div');
+                moreEl.className = 'file-item';
+                moreEl.innerHTML = `
+                    <i class="fas fa-ellipsis-h"></i>
+                    <span>${item.name}</span>
+                `;
+                
+                moreEl.addEventListener('click', async (e) => {
+                    e.stopPropagation();
+                    if (item.loading) return;
+                    item.loading = true;
+                    let entries;
+                    try {
+                        entries = await this.loadMoreEntries(item);
+                    } finally {
+                        item.loading = false;
+                    }
+                    
+                    // On failure keep the row, so the rest can still be fetched
+                    if (entries === null) return;
+                    moreEl.remove();
+                    this.renderFileTree(entries, fileTreeEl);
+                });
+                
+                fileTreeEl.appendChild(moreEl);
             } else {
                 const fileEl = document.createElement('div');
                 fileEl.className = 'file-item';
@@ -263,7 +359,14 @@ class VoiceFirstIDE {
                 return;
             }
             
-            // Otherwise, load from backend
+            // Binary assets are served as-is, in a new browser tab
+            if (RAW_FILE_EXTENSIONS.has(path.split('.').pop().toLowerCase())) {
+                window.open(`/api/file/raw?path=${encodeURIComponent(path)}`, '_blank');
+                this.addMessage('assistant', `Opened: ${path}`);
+                return;
+            }
+            
+            // Otherwise, load from backend (large files are streamed by the server)
             const response = await fetch('/api/file/read', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
@@ -0,0 +1,64 @@
+"""
+Workspace containment tests for the web IDE file endpoints.
+
+Run with: python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Plain threads: the test client doesn't need eventlet's monkey-patching
+os.environ.setdefault('ASYNC_MODE', 'threading')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import web_ide
+
+
+class WorkspacePathTests(unittest.TestCase):
+    """A symlink followed by '..' must not reach files outside the workspace."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.workspace = self.root / 'ws'
+        (self.workspace / 'sub' / 'deep').mkdir(parents=True)
+        (self.workspace / 'link').symlink_to(Path('sub') / 'deep', target_is_directory=True)
+        (self.root / 'secret.txt').write_text('top secret')
+
+        self.client = web_ide.app.test_client()
+        response = self.client.post('/api/workspace/set', json={'path': str(self.workspace)})
+        self.assertEqual(response.status_code, 200)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_read_through_symlink_and_dotdot_is_rejected(self):
+        response = self.client.post('/api/file/read', json={'path': 'link/../../secret.txt'})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('top secret', response.get_data(as_text=True))
+
+    def test_write_through_symlink_and_dotdot_is_rejected(self):
+        response = self.client.post('/api/file/write', json={
+            'path': 'link/../../pwned.txt',
+            'content': 'x'
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse((self.root / 'pwned.txt').exists())
+
+    def test_create_through_symlink_and_dotdot_is_rejected(self):
+        response = self.client.post('/api/file/create', json={'path': 'link/../../pwned.txt'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse((self.root / 'pwned.txt').exists())
+
+    def test_file_through_symlink_inside_workspace_is_readable(self):
+        (self.workspace / 'sub' / 'deep' / 'a.py').write_text('print(1)\n')
+        response = self.client.post('/api/file/read', json={'path': 'link/a.py'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['content'], 'print(1)\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -48,5 +48,18 @@ class Tool(ABC):
         """
         pass
     
+    def prewarm(self) -> None:
+        """
+        Set up clients ahead of the first call (no-op by default).
+        
+        Called once from a background task when the first web client
+        connects, so the first command doesn't pay for SDK imports and
+        client setup. Overrides swallow their errors: call() hits and
+        reports the same failure, with context, when it matters. The
+        clients they build must not block the event loop (see the
+        *_TRANSPORT settings).
+        """
+        pass
+    
     def __repr__(self):
         return f"{self.__class__.__name__}(name='{self.name}')"
\ No newline at end of file
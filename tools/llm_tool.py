@@ -2,7 +2,8 @@
 LLM Tool - wraps various LLM providers (Gemini, Groq, etc).
 """
 
-from typing import Any
+import threading
+from typing import Any, Dict
 from .base import Tool, ToolResult
 from config import settings
 
@@ -10,6 +11,12 @@ from config import settings
 class GeminiLLMTool(Tool):
     """Google Gemini LLM wrapper - Real API implementation."""
     
+    # genai.configure() replaces the SDK's client (and its open connection), so it
+    # runs once per process; models are shared by every instance using the same name
+    _configured = False
+    _models: Dict[str, Any] = {}
+    _client_lock = threading.Lock()
+    
     def __init__(self, model: str = "gemini-2.0-flash-exp"):
         super().__init__(
             name="Gemini 2.0 Flash",
@@ -19,19 +26,45 @@ class GeminiLLMTool(Tool):
         self.client = None
     
     def _get_client(self):
-        """Lazy initialization of Gemini client."""
+        """Lazy initialization of Gemini client, shared across instances."""
         if self.client is None:
             try:
                 import google.generativeai as genai
-                # Configure Gemini with API key from settings
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.client = genai.GenerativeModel(self.model)
+                cls = GeminiLLMTool
+                with cls._client_lock:
+                    if not cls._configured:
+                        # Configure Gemini with API key from settings
+                        genai.configure(api_key=settings.GEMINI_API_KEY, transport=settings.GEMINI_TRANSPORT)
+                        cls._configured = True
+                    if self.model not in cls._models:
+                        cls._models[self.model] = genai.GenerativeModel(self.model)
+                self.client = cls._models[self.model]
             except ImportError:
                 raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
             except Exception as e:
                 raise Exception(f"Failed to initialize Gemini client: {e}")
         return self.client
     
+    def prewarm(self) -> None:
+        """Import the SDK and configure the shared model before the first prompt."""
+        try:
+            self._get_client()
+        except Exception:
+            pass
+    
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """
+        Text of one streamed response chunk, or "" if it has none.
+        
+        chunk.text raises ValueError for chunks without parts (e.g. a final
+        chunk carrying only finish_reason or usage), so read the parts directly.
+        """
+        candidates = chunk.candidates
+        if not candidates or candidates[0].content is None:
+            return ""
+        return "".join(getattr(part, "text", "") or "" for part in candidates[0].content.parts)
+    
     def call(self, input_data: Any, **kwargs) -> ToolResult:
         """
         Generate text using Gemini API.
@@ -39,12 +72,15 @@ class GeminiLLMTool(Tool):
         Args:
             input_data: Text prompt
             **kwargs: Additional parameters (temperature, max_tokens, etc.)
+                on_token: Optional callback; when set, the response is streamed
+                    and each text chunk is passed to it as it arrives
             
         Returns:
             ToolResult with generated text
         """
         try:
             prompt = str(input_data)
+            on_token = kwargs.get("on_token")
             
             # Get Gemini client
             model = self._get_client()
@@ -55,21 +91,44 @@ class GeminiLLMTool(Tool):
                 "max_output_tokens": kwargs.get("max_tokens", 2048),
             }
             
-            # Call Gemini API
-            response = model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
+            if on_token is not None:
+                # Stream the response, forwarding chunks as they arrive
+                response = model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    stream=True
+                )
+                
+                parts = []
+                for chunk in response:
+                    text = self._chunk_text(chunk)
+                    if text:
+                        parts.append(text)
+                        on_token(text)
+                output = "".join(parts)
+            else:
+                # Call Gemini API
+                response = model.generate_content(
+                    prompt,
+                    generation_config=generation_config
+                )
+                
+                # Extract text
+                output = response.text
             
-            # Extract text
-            output = response.text
+            # Prefer Gemini's reported usage; fall back to a word count
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None and usage.candidates_token_count:
+                tokens = usage.prompt_token_count + usage.candidates_token_count
+            else:
+                tokens = len(output.split())  # Approximate token count
             
             return ToolResult(
                 success=True,
                 output=output,
                 metadata={
                     "model": self.model,
-                    "tokens": len(output.split())  # Approximate token count
+                    "tokens": tokens
                 }
             )
             
@@ -91,20 +150,23 @@ class GroqLLMTool(Tool):
         )
         self.model = model
         self.client = None
+        self._client_lock = threading.Lock()
     
     def _get_client(self):
-        """Lazy initialization of Groq client."""
+        """Lazy initialization of Groq client (thread-safe)."""
         if self.client is None:
-            try:
-                from groq import Groq
-                import os
-                # Set API key via environment variable (more reliable)
-                os.environ['GROQ_API_KEY'] = settings.GROQ_API_KEY
-                self.client = Groq()
-            except ImportError:
-                raise ImportError("groq package not installed. Run: pip install groq")
-            except Exception as e:
-                raise Exception(f"Failed to initialize Groq client: {e}")
+            with self._client_lock:
+                if self.client is None:
+                    try:
+                        from groq import Groq
+                        import os
+                        # Set API key via environment variable (more reliable)
+                        os.environ['GROQ_API_KEY'] = settings.GROQ_API_KEY
+                        self.client = Groq()
+                    except ImportError:
+                        raise ImportError("groq package not installed. Run: pip install groq")
+                    except Exception as e:
+                        raise Exception(f"Failed to initialize Groq client: {e}")
         return self.client
     
     def call(self, input_data: Any, **kwargs) -> ToolResult:
@@ -4,6 +4,7 @@ Speech-to-Text (STT) Tool implementations.
 Supports Google Cloud Speech-to-Text and Groq Whisper.
 """
 
+import threading
 from typing import Any
 from .base import Tool, ToolResult
 from config import settings
@@ -18,28 +19,41 @@ class GoogleSTTTool(Tool):
             description="Google Cloud Speech-to-Text API (SOTA)"
         )
         self.client = None
+        self._client_lock = threading.Lock()
     
     def _get_client(self):
-        """Lazy initialization of Google Speech client."""
+        """Lazy initialization of Google Speech client (thread-safe)."""
         if self.client is None:
-            try:
-                from google.cloud import speech
-                from config import settings
-                import os
-                
-                # Set credentials if provided
-                if settings.GOOGLE_APPLICATION_CREDENTIALS:
-                    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = settings.GOOGLE_APPLICATION_CREDENTIALS
-                
-                self.client = speech.SpeechClient()
-            except ImportError:
-                raise ImportError(
-                    "google-cloud-speech not installed. Run: pip install google-cloud-speech"
-                )
-            except Exception as e:
-                raise Exception(f"Failed to initialize Google STT client: {e}")
+            # Concurrent voice commands share this tool; build the client only once
+            with self._client_lock:
+                if self.client is None:
+                    try:
+                        from google.cloud import speech
+                        from config import settings
+                        import os
+                        
+                        # Set credentials if provided
+                        if settings.GOOGLE_APPLICATION_CREDENTIALS:
+                            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = settings.GOOGLE_APPLICATION_CREDENTIALS
+                        
+                        # REST by default: gRPC isn't green-safe and would block
+                        # (or hang) the eventlet loop during recognize()
+                        self.client = speech.SpeechClient(transport=settings.GOOGLE_STT_TRANSPORT)
+                    except ImportError:
+                        raise ImportError(
+                            "google-cloud-speech not installed. Run: pip install google-cloud-speech"
+                        )
+                    except Exception as e:
+                        raise Exception(f"Failed to initialize Google STT client: {e}")
         return self.client
     
+    def prewarm(self) -> None:
+        """Create the Speech client before the first transcription."""
+        try:
+            self._get_client()
+        except Exception:
+            pass
+    
     def call(self, input_data: Any, **kwargs) -> ToolResult:
         """
         Transcribe audio using Google Cloud STT.
@@ -0,0 +1,52 @@
+"""
+Flask JSON provider backed by orjson.
+
+orjson serializes straight to bytes and is several times faster than the
+stdlib json module on the large nested dicts returned by the file tree and
+observability endpoints.
+"""
+
+from typing import Any, Union
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Drop-in replacement for Flask's JSON provider using orjson."""
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize obj to a JSON string."""
+        return orjson.dumps(obj, default=self.default, option=self.option).decode("utf-8")
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize a JSON string or bytes."""
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response from the raw orjson bytes, skipping the str round trip."""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.option
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
+
+
+class OrjsonSocketJSON:
+    """json-module stand-in for python-socketio's ``json`` option."""
+
+    @staticmethod
+    def dumps(obj: Any, **kwargs: Any) -> str:
+        """Serialize a packet payload; socketio's separators kwarg is ignored (orjson is always compact)."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    @staticmethod
+    def loads(s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize an incoming packet payload."""
+        return orjson.loads(s)
@@ -10,13 +10,27 @@ Tracks:
 - Step-wise latency
 """
 
+import atexit
+import gzip
 import json
+import logging
+import shutil
+import threading
 import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, asdict
 
+log = logging.getLogger(__name__)
+
+# Cap on load-error lines per tracker start, so a corrupt log directory can't flood the output
+MAX_LOAD_ERRORS_LOGGED = 10
+
+# How often the background thread drains queued records to disk
+FLUSH_INTERVAL_S = 0.1
+
 
 @dataclass
 class ToolUsage:
@@ -57,6 +71,21 @@ class ObservabilityRecord:
     error: Optional[str] = None
 
 
+def _approx_len(data: Any) -> int:
+    """
+    Approximate the serialized length of a tool input/output.
+    
+    Avoids str() on large payloads (audio bytes, plans) just to count characters.
+    """
+    if data is None:
+        return 0
+    if isinstance(data, (str, bytes, bytearray, memoryview)):
+        return len(data)
+    if isinstance(data, (list, tuple, dict)):
+        return len(data) * 32  # rough per-item estimate
+    return 64  # scalar approximation
+
+
 class ObservabilityTracker:
     """Track observability metrics for agent pipeline execution."""
     
@@ -78,6 +107,20 @@ class ObservabilityTracker:
         }
     }
     
+    # Rough approximations: 1 token ≈ 4 characters, STT speech at 150 words per minute
+    _TOKENS_PER_CHAR = 1 / 4
+    _MINUTES_PER_CHAR = 1 / 150 / 60
+    
+    # PRICING folded into per-token rates once at class load (keys lowercased for matching)
+    _PRICING_FAST = {
+        model_key.lower(): (
+            {"pm": pricing["per_minute"]} if "per_minute" in pricing else
+            {"input_pt": pricing.get("input", 0) / 1_000_000,
+             "output_pt": pricing.get("output", 0) / 1_000_000}
+        )
+        for model_key, pricing in PRICING.items()
+    }
+    
     def __init__(self, storage_path: str = "logs/observability"):
         """Initialize tracker with storage path."""
         self.storage_path = Path(storage_path)
@@ -87,24 +130,36 @@ class ObservabilityTracker:
         self.current_record: Optional[Dict] = None
         self.records: List[ObservabilityRecord] = []
         
+        # Daily JSONL file, kept open across requests
+        self._fh = None
+        self._fh_date: Optional[str] = None
+        
+        # Finished records waiting for the flush thread
+        self._pending = deque()
+        self._io_lock = threading.Lock()
+        self._stop_flush = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        
+        self._load_errors = 0
+        
         # Load existing records
         self._load_records()
     
     def start_tracking(self, query: str) -> str:
         """Start tracking a new request."""
-        record_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        now = datetime.now()
+        record_id = now.strftime('%Y%m%d_%H%M%S_%f')
         
+        # Only raw values are recorded while the pipeline runs; ToolUsage and
+        # AgentExecution objects, timestamps and costs are built in end_tracking
         self.current_record = {
             "id": record_id,
             "query": query,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "start_time": time.time(),
-            "agents": [],
-            "tools": [],
-            "total_tokens": 0,
-            "total_cost_usd": 0.0,
-            "success": False,
-            "error": None
+            "agent_starts": {},  # stage -> start time
+            "agent_raw": [],  # (name, stage, tools_used, tokens, start, end, success)
+            "tool_raw": []  # (name, input_length, output_length, tokens, latency_ms, time)
         }
         
         return record_id
@@ -114,8 +169,7 @@ class ObservabilityTracker:
         if not self.current_record:
             return
         
-        self.current_record[f"agent_{stage}_start"] = time.time()
-        self.current_record[f"agent_{stage}_name"] = agent_name
+        self.current_record["agent_starts"][stage] = time.time()
     
     def track_agent_end(self, agent_name: str, stage: str, tools_used: List[str], 
                         tokens: int = 0, success: bool = True):
@@ -123,24 +177,13 @@ class ObservabilityTracker:
         if not self.current_record:
             return
         
-        start_key = f"agent_{stage}_start"
-        if start_key not in self.current_record:
+        start = self.current_record["agent_starts"].get(stage)
+        if start is None:
             return
         
-        latency = (time.time() - self.current_record[start_key]) * 1000  # Convert to ms
-        
-        agent_exec = AgentExecution(
-            name=agent_name,
-            stage=stage,
-            tools_used=tools_used,
-            tokens=tokens,
-            latency_ms=round(latency, 2),
-            success=success,
-            timestamp=datetime.now().isoformat()
+        self.current_record["agent_raw"].append(
+            (agent_name, stage, tools_used, tokens, start, time.time(), success)
         )
-        
-        self.current_record["agents"].append(agent_exec)
-        self.current_record["total_tokens"] += tokens
     
     def track_tool_usage(self, tool_name: str, input_data: Any, output_data: Any,
                          tokens: int = 0, latency_ms: float = 0):
@@ -148,71 +191,75 @@ class ObservabilityTracker:
         if not self.current_record:
             return
         
-        order = len(self.current_record["tools"]) + 1
-        
-        input_length = len(str(input_data)) if input_data else 0
-        output_length = len(str(output_data)) if output_data else 0
-        
-        tool_usage = ToolUsage(
-            name=tool_name,
-            order=order,
-            input_length=input_length,
-            output_length=output_length,
-            tokens=tokens,
-            latency_ms=round(latency_ms, 2),
-            timestamp=datetime.now().isoformat()
+        self.current_record["tool_raw"].append(
+            (tool_name, _approx_len(input_data), _approx_len(output_data),
+             tokens, latency_ms, time.time())
         )
-        
-        self.current_record["tools"].append(tool_usage)
-        
-        # Calculate cost for this tool
-        cost = self._calculate_tool_cost(tool_name, tokens, input_length, output_length)
-        self.current_record["total_cost_usd"] += cost
     
     def _calculate_tool_cost(self, tool_name: str, tokens: int, 
                             input_length: int, output_length: int) -> float:
         """Calculate cost for a tool usage."""
-        # Estimate token counts (rough approximation: 1 token ≈ 4 characters)
-        estimated_input_tokens = input_length / 4
-        estimated_output_tokens = output_length / 4
-        
-        # Use provided tokens if available, otherwise use estimates
-        if tokens > 0:
-            total_tokens = tokens
-        else:
-            total_tokens = estimated_input_tokens + estimated_output_tokens
+        tool_name_lower = tool_name.lower()
         
         # Find pricing
-        for model_key, pricing in self.PRICING.items():
-            if model_key.lower() in tool_name.lower():
-                if "per_minute" in pricing:
+        for model_key, pricing in self._PRICING_FAST.items():
+            if model_key in tool_name_lower:
+                if "pm" in pricing:
                     # For STT - estimate duration (rough: 150 words per minute)
-                    estimated_minutes = max(input_length / 150 / 60, 0.1)
-                    return pricing["per_minute"] * estimated_minutes
+                    estimated_minutes = max(input_length * self._MINUTES_PER_CHAR, 0.1)
+                    return pricing["pm"] * estimated_minutes
                 else:
-                    # For LLM - calculate based on tokens
-                    input_cost = (estimated_input_tokens / 1_000_000) * pricing.get("input", 0)
-                    output_cost = (estimated_output_tokens / 1_000_000) * pricing.get("output", 0)
-                    return input_cost + output_cost
+                    # For LLM - estimate tokens from character counts
+                    return (input_length * pricing["input_pt"] +
+                            output_length * pricing["output_pt"]) * self._TOKENS_PER_CHAR
         
         return 0.0  # Default if pricing not found
     
     def end_tracking(self, success: bool = True, error: Optional[str] = None):
-        """End tracking and save the record."""
+        """End tracking, materialize the buffered events and save the record."""
         if not self.current_record:
             return
         
-        total_latency = (time.time() - self.current_record["start_time"]) * 1000
+        end_time = time.time()
+        current = self.current_record
+        
+        agents = []
+        total_tokens = 0
+        for name, stage, tools_used, tokens, start, end, agent_success in current["agent_raw"]:
+            agents.append(AgentExecution(
+                name=name,
+                stage=stage,
+                tools_used=tools_used,
+                tokens=tokens,
+                latency_ms=round((end - start) * 1000, 2),
+                success=agent_success,
+                timestamp=datetime.fromtimestamp(end).isoformat()
+            ))
+            total_tokens += tokens
+        
+        tools = []
+        total_cost = 0.0
+        for order, (name, input_length, output_length, tokens, latency_ms, at) in enumerate(current["tool_raw"], 1):
+            tools.append(ToolUsage(
+                name=name,
+                order=order,
+                input_length=input_length,
+                output_length=output_length,
+                tokens=tokens,
+                latency_ms=round(latency_ms, 2),
+                timestamp=datetime.fromtimestamp(at).isoformat()
+            ))
+            total_cost += self._calculate_tool_cost(name, tokens, input_length, output_length)
         
         record = ObservabilityRecord(
-            id=self.current_record["id"],
-            query=self.current_record["query"],
-            timestamp=self.current_record["timestamp"],
-            agents=self.current_record["agents"],
-            tools=self.current_record["tools"],
-            total_tokens=self.current_record["total_tokens"],
-            total_cost_usd=round(self.current_record["total_cost_usd"], 6),
-            total_latency_ms=round(total_latency, 2),
+            id=current["id"],
+            query=current["query"],
+            timestamp=current["timestamp"],
+            agents=agents,
+            tools=tools,
+            total_tokens=total_tokens,
+            total_cost_usd=round(total_cost, 6),
+            total_latency_ms=round((end_time - current["start_time"]) * 1000, 2),
             success=success,
             error=error
         )
@@ -223,46 +270,145 @@ class ObservabilityTracker:
         # Reset current tracking
         self.current_record = None
     
+    def _rotate_log_file(self):
+        """Open today's JSONL file, closing the previous day's file if needed."""
+        today = datetime.now().strftime("%Y%m%d")
+        if self._fh is not None and self._fh_date == today:
+            return
+        
+        if self._fh is not None:
+            self._fh.close()
+        
+        self._fh = open(self.storage_path / f"obs_{today}.jsonl", 'a', encoding='utf-8')
+        self._fh_date = today
+    
     def _save_record(self, record: ObservabilityRecord):
-        """Save a single record to disk."""
-        file_path = self.storage_path / f"{record.id}.json"
+        """Queue a record for the background flush thread."""
+        self._pending.append(record)
+        
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name="obs-flush", daemon=True
+            )
+            self._flush_thread.start()
+    
+    def _flush_loop(self):
+        """Drain queued records every FLUSH_INTERVAL_S until stopped."""
+        while not self._stop_flush.wait(FLUSH_INTERVAL_S):
+            self.flush()
+    
+    def flush(self):
+        """Write all queued records to the daily JSONL file in a single write."""
+        with self._io_lock:
+            lines = []
+            while self._pending:
+                lines.append(json.dumps(asdict(self._pending.popleft()), ensure_ascii=False))
+            if not lines:
+                return
+            
+            self._rotate_log_file()
+            self._fh.write("\n".join(lines) + "\n")
+            self._fh.flush()
+    
+    def close(self):
+        """Stop the flush thread, write pending records and close the JSONL file."""
+        self._stop_flush.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self._stop_flush.clear()
+        
+        self.flush()
+        
+        with self._io_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+                self._fh_date = None
+    
+    def compact(self):
+        """Gzip JSONL files from previous days, leaving today's file open for appends."""
+        self.flush()
+        today_file = f"obs_{datetime.now().strftime('%Y%m%d')}.jsonl"
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(asdict(record), f, indent=2, ensure_ascii=False)
+        for jsonl_file in self.storage_path.glob("obs_*.jsonl"):
+            if jsonl_file.name == today_file:
+                continue
+            
+            gz_path = jsonl_file.with_name(jsonl_file.name + ".gz")
+            with open(jsonl_file, 'rb') as src, gzip.open(gz_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            jsonl_file.unlink()
     
-    def _load_records(self):
-        """Load all existing records from disk."""
+    def _record_from_dict(self, data: Dict) -> ObservabilityRecord:
+        """Reconstruct a record (and its nested dataclasses) from a dict."""
+        agents = [AgentExecution(**a) for a in data.get("agents", [])]
+        tools = [ToolUsage(**t) for t in data.get("tools", [])]
+        
+        return ObservabilityRecord(
+            id=data["id"],
+            query=data["query"],
+            timestamp=data["timestamp"],
+            agents=agents,
+            tools=tools,
+            total_tokens=data["total_tokens"],
+            total_cost_usd=data["total_cost_usd"],
+            total_latency_ms=data["total_latency_ms"],
+            success=data["success"],
+            error=data.get("error")
+        )
+    
+    def _load_records(self, limit: int = 100):
+        """Load the most recent records from disk (newest first)."""
         if not self.storage_path.exists():
             return
         
+        # Daily JSONL files (plain or compacted), newest day first
+        jsonl_files = sorted(
+            list(self.storage_path.glob("obs_*.jsonl")) + list(self.storage_path.glob("obs_*.jsonl.gz")),
+            key=lambda p: p.name.split('.')[0],
+            reverse=True
+        )
+        
+        for jsonl_file in jsonl_files:
+            if len(self.records) >= limit:
+                return
+            
+            try:
+                opener = gzip.open if jsonl_file.suffix == ".gz" else open
+                with opener(jsonl_file, 'rt', encoding='utf-8') as f:
+                    lines = f.readlines()
+            except Exception as e:
+                self._log_load_error(jsonl_file, e)
+                continue
+            
+            for line in reversed(lines):
+                if len(self.records) >= limit:
+                    return
+                if not line.strip():
+                    continue
+                try:
+                    self.records.append(self._record_from_dict(json.loads(line)))
+                except Exception as e:
+                    self._log_load_error(jsonl_file, e)
+        
+        # Legacy one-file-per-record storage
         json_files = sorted(self.storage_path.glob("*.json"), reverse=True)
         
-        # Load up to last 100 records
-        for json_file in json_files[:100]:
+        for json_file in json_files[:limit - len(self.records)]:
             try:
                 with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    # Reconstruct dataclass objects
-                    agents = [AgentExecution(**a) for a in data.get("agents", [])]
-                    tools = [ToolUsage(**t) for t in data.get("tools", [])]
-                    
-                    record = ObservabilityRecord(
-                        id=data["id"],
-                        query=data["query"],
-                        timestamp=data["timestamp"],
-                        agents=agents,
-                        tools=tools,
-                        total_tokens=data["total_tokens"],
-                        total_cost_usd=data["total_cost_usd"],
-                        total_latency_ms=data["total_latency_ms"],
-                        success=data["success"],
-                        error=data.get("error")
-                    )
-                    
-                    self.records.append(record)
+                    self.records.append(self._record_from_dict(json.load(f)))
             except Exception as e:
-                print(f"Error loading record {json_file}: {e}")
+                self._log_load_error(json_file, e)
+    
+    def _log_load_error(self, path: Path, error: Exception):
+        """Log a record loading failure, at most MAX_LOAD_ERRORS_LOGGED times."""
+        self._load_errors += 1
+        if self._load_errors <= MAX_LOAD_ERRORS_LOGGED:
+            log.warning("Error loading record %s: %s", path, error)
+        elif self._load_errors == MAX_LOAD_ERRORS_LOGGED + 1:
+            log.warning("Further record loading errors suppressed")
     
     def get_all_records(self) -> List[Dict]:
         """Get all records as dictionaries."""
@@ -322,7 +468,18 @@ def get_tracker() -> ObservabilityTracker:
     return _global_tracker
 
 
+def _close_global_tracker():
+    """Flush the global tracker's queued records at interpreter exit."""
+    if _global_tracker is not None:
+        _global_tracker.close()
+
+
+atexit.register(_close_global_tracker)
+
+
 def reset_tracker():
     """Reset the global tracker."""
     global _global_tracker
+    if _global_tracker is not None:
+        _global_tracker.close()
     _global_tracker = ObservabilityTracker()
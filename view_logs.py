@@ -6,6 +6,7 @@ Shows the most recent log file or a specific log.
 """
 
 import json
+import os
 import sys
 from pathlib import Path
 from rich.console import Console
@@ -23,8 +24,15 @@ def list_logs():
         console.print("[yellow]No logs directory found[/yellow]")
         return []
     
-    log_files = sorted(log_dir.glob("agent_calls_*.log"), reverse=True)
-    return log_files
+    # scandir + plain string checks avoids building a Path per directory entry
+    with os.scandir(log_dir) as it:
+        names = [
+            entry.name for entry in it
+            if entry.name.startswith("agent_calls_") and entry.name.endswith(".log")
+        ]
+    names.sort(reverse=True)
+    
+    return [log_dir / name for name in names]
 
 
 def view_text_log(log_file: Path):
@@ -83,29 +91,35 @@ def view_summary(json_file: Path):
         console.print("[yellow]No agent calls found in log[/yellow]")
         return
     
-    # Create table
-    table = Table(title=f"Agent Call Summary - {json_file.name}")
-    table.add_column("#", style="cyan")
-    table.add_column("Agent", style="bold")
-    table.add_column("Status", style="green")
-    table.add_column("Time", style="dim")
-    table.add_column("Input (preview)", style="yellow")
-    table.add_column("Error", style="red")
-    
+    rows = []
     for i, call in enumerate(agent_calls, 1):
         status = "✅" if call['success'] else "❌"
         time = call['timestamp'].split('T')[1].split('.')[0]  # Extract HH:MM:SS
-        input_preview = str(call['input'])[:50] + "..." if len(str(call['input'])) > 50 else str(call['input'])
+        input_text = str(call['input'])
+        input_preview = input_text[:50] + "..." if len(input_text) > 50 else input_text
         error = call['error'] if call['error'] else ""
         
-        table.add_row(
-            str(i),
-            call['agent'],
-            status,
-            time,
-            input_preview,
-            error[:50] if error else ""
-        )
+        rows.append((str(i), call['agent'], status, time, input_preview, error[:50]))
+    
+    # Piped output (e.g. to a file): skip Rich's table rendering entirely
+    if not console.is_terminal:
+        print(f"Agent Call Summary - {json_file.name}")
+        for row in rows:
+            print("\t".join(row))
+        return
+    
+    # Fixed column widths let Rich skip its content measurement passes
+    table = Table(title=f"Agent Call Summary - {json_file.name}", width=120,
+                  show_edge=False, pad_edge=False)
+    table.add_column("#", style="cyan", width=4, no_wrap=True)
+    table.add_column("Agent", style="bold", width=18, no_wrap=True, overflow="ellipsis")
+    table.add_column("Status", style="green", width=6, no_wrap=True)
+    table.add_column("Time", style="dim", width=8, no_wrap=True)
+    table.add_column("Input (preview)", style="yellow", width=40, no_wrap=True, overflow="ellipsis")
+    table.add_column("Error", style="red", width=30, no_wrap=True, overflow="ellipsis")
+    
+    for row in rows:
+        table.add_row(*row)
     
     console.print(table)
 
@@ -4,17 +4,40 @@ Voice First IDE - Web Server
 A VS Code-like interface with voice-first development capabilities
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+import os
+
+# Serve sockets and REST calls from cooperative green threads, so file-tree and
+# read/write requests keep flowing while a voice command waits on the LLM.
+# eventlet must patch the stdlib before Flask or anything else imports socket/threading.
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'eventlet')
+if ASYNC_MODE == 'eventlet':
+    try:
+        import eventlet
+        eventlet.monkey_patch()
+    except ImportError:
+        ASYNC_MODE = 'threading'
+
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context
 from flask_socketio import SocketIO, emit
+from flask_compress import Compress
+from werkzeug.exceptions import NotFound
 from pathlib import Path
-import os
-import json
+from typing import Dict, Optional, Tuple
+import codecs
+import hashlib
+import msgspec
+import orjson
+import stat
 import threading
-import base64
-import io
-import wave
+import time
+import traceback
+import types
+import binascii
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Import agents
+from agents import AgentResult
 from agents.speech_agent import SpeechAgent
 from agents.security_agent import SecurityAgent
 from agents.reasoning_agent import ReasoningAgent
@@ -30,61 +53,470 @@ from utils.logger import get_logger, reset_logger
 
 # Import observability
 from utils.observability import get_tracker
+from utils.json_provider import OrjsonProvider, OrjsonSocketJSON
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'voice-cursor-ide-secret'
-socketio = SocketIO(app, cors_allowed_origins="*")
+app.json = OrjsonProvider(app)
+
+# Behind a proxy that honours X-Sendfile (Apache mod_xsendfile, lighttpd), file
+# bodies from send_from_directory are sent by the proxy instead of Python
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+# Compress JSON API responses (file trees are mostly repeated keys): brotli when the
+# browser accepts it, else gzip at level 4 to keep it cheap; tiny bodies aren't worth it
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
+
+socketio = SocketIO(app, async_mode=ASYNC_MODE, cors_allowed_origins="*", json=OrjsonSocketJSON)
 
 # Global workspace directory (user can change this)
 WORKSPACE_DIR = Path.cwd()
 
+# WORKSPACE_DIR as a string and the length of its prefix incl. separator, so the
+# tree builder can slice relative paths instead of calling relative_to per entry
+_WS_STR = str(WORKSPACE_DIR)
+_WS_LEN = len(os.path.join(_WS_STR, ''))
+
+# Fully resolved workspace root (and with trailing separator) for containment checks
+_WS_ROOT = os.path.realpath(WORKSPACE_DIR)
+_WS_ROOT_PREFIX = os.path.join(_WS_ROOT, '')
+
+# File reads are capped at 10MB; files over 1MB are streamed in 64KB chunks
+MAX_FILE_SIZE = 10 * 1024 * 1024
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Extra flags for os.open: don't leak fds to child processes, no newline translation on Windows
+_OPEN_FLAGS = getattr(os, 'O_CLOEXEC', 0) | getattr(os, 'O_BINARY', 0)
+
 
-def get_file_tree(directory: Path, max_depth=5, current_depth=0):
-    """Get file tree structure for the file explorer."""
-    if current_depth >= max_depth:
-        return []
+# Typed JSON bodies of the POST endpoints, decoded and validated in one pass by msgspec
+class ReadReq(msgspec.Struct):
+    path: str
+
+
+class WriteReq(msgspec.Struct):
+    path: str
+    content: str
+
+
+class CreateReq(msgspec.Struct):
+    path: str
+
+
+class WorkspaceReq(msgspec.Struct):
+    path: str
+
+
+def _decode_request(req_type):
+    """
+    Decode the request body into req_type.
     
+    Returns (request, None), or (None, error response) for a malformed payload.
+    """
     try:
-        items = []
-        for item in sorted(directory.iterdir()):
+        return msgspec.json.decode(request.get_data(cache=False), type=req_type), None
+    except msgspec.DecodeError as e:  # also covers ValidationError
+        return None, (jsonify({
+            'success': False,
+            'error': f'Invalid request: {e}'
+        }), 400)
+
+
+# Directories larger than this are sent a page at a time (see /api/workspace/dir)
+MAX_ENTRIES_PER_DIR = 1000
+
+# Dependency, build and VCS directories never shown in the file explorer. Dotfiles
+# are skipped by their first character, so the dotted names are listed for clarity
+_IGNORE = frozenset({
+    '__pycache__', 'node_modules', 'venv', 'dist', 'build', 'target',
+    '.git', '.svn', '.hg', '.venv', '.next'
+})
+
+
+# Per-directory listing cache: directory path -> (mtime_ns, entries in readdir
+# order, entries sorted by name or None until a sorted listing is requested)
+_TREE_CACHE: Dict[str, Tuple[int, tuple, Optional[tuple]]] = {}
+_TREE_CACHE_LOCK = threading.RLock()
+
+
+def _list_dir(path: str) -> tuple:
+    """Read one directory level from disk as (name, is_dir, size, is_link) tuples, in readdir order."""
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
             # Skip hidden files and common ignore patterns
-            if item.name.startswith('.') or item.name in ['__pycache__', 'node_modules', 'venv', '.git']:
+            name = entry.name
+            if name[:1] == '.' or name in _IGNORE:
                 continue
             
-            if item.is_dir():
-                items.append({
-                    'name': item.name,
-                    'type': 'directory',
-                    'path': str(item.relative_to(WORKSPACE_DIR)),
-                    'children': get_file_tree(item, max_depth, current_depth + 1)
-                })
+            # DirEntry answers is_dir()/is_symlink() from the readdir data, no
+            # extra stat; file size is one lstat (free on Windows)
+            if entry.is_dir(follow_symlinks=False):
+                entries.append((name, True, 0, False))
+            elif entry.is_symlink():
+                # Classified by its target (one stat), so a link to a directory
+                # opens as one. Broken links are skipped. The tree walk never
+                # descends into links, which rules out loops
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    entries.append((name, True, 0, True))
+                else:
+                    entries.append((name, False, st.st_size, True))
             else:
-                items.append({
-                    'name': item.name,
-                    'type': 'file',
-                    'path': str(item.relative_to(WORKSPACE_DIR)),
-                    'size': item.stat().st_size
-                })
-        
-        return items
+                entries.append((name, False, entry.stat(follow_symlinks=False).st_size, False))
+    return tuple(entries)
+
+
+def _scan_one_level(path: str, mtime_ns: int, sort: bool = True, offload: bool = False):
+    """
+    List a single directory level as (name, is_dir, size, is_link) tuples.
+    
+    Entries are sorted by name unless sort=False, which keeps the readdir
+    order and leaves sorting to the client. Both orders are kept for an
+    unchanged directory, so paging through either one stays consistent.
+    Cached by directory mtime: it changes whenever entries are added,
+    removed or renamed, so an unchanged directory is served from memory.
+    File size changes don't touch the directory mtime, hence
+    _invalidate_file_caches(). With offload=True a cache miss reads the
+    directory on a native thread under eventlet.
+    """
+    with _TREE_CACHE_LOCK:
+        cached = _TREE_CACHE.get(path)
+    
+    if cached is None or cached[0] != mtime_ns:
+        # Only the disk read runs on the native thread; the cache and its lock
+        # stay on the calling (green) thread
+        if offload and tpool is not None:
+            entries = tpool.execute(_list_dir, path)
+        else:
+            entries = _list_dir(path)
+        cached = (mtime_ns, entries, None)
+        with _TREE_CACHE_LOCK:
+            _TREE_CACHE[path] = cached
+    
+    if not sort:
+        return cached[1]
+    
+    if cached[2] is None:
+        # Case-insensitive order, like the OS file explorers
+        cached = (mtime_ns, cached[1], tuple(sorted(cached[1], key=lambda e: e[0].casefold())))
+        with _TREE_CACHE_LOCK:
+            _TREE_CACHE[path] = cached
+    return cached[2]
+
+
+# Negative cache for read_file: path -> expiry (monotonic time). Repeated
+# probes for a missing file answer 404 without a syscall. Entries written by
+# this server are dropped on write/create; the TTL bounds staleness for files
+# created outside the IDE.
+_MISSING_FILES: Dict[str, float] = {}
+_MISSING_FILES_LOCK = threading.Lock()
+MISSING_FILE_TTL = 5.0
+MAX_MISSING_FILES = 1024
+
+
+def _is_known_missing(file_path: Path) -> bool:
+    """Check the negative cache for a recently missing file."""
+    key = str(file_path)
+    with _MISSING_FILES_LOCK:
+        expiry = _MISSING_FILES.get(key)
+        if expiry is None:
+            return False
+        if expiry < time.monotonic():
+            del _MISSING_FILES[key]
+            return False
+        return True
+
+
+def _remember_missing(file_path: Path):
+    """Record a file as missing for MISSING_FILE_TTL seconds."""
+    with _MISSING_FILES_LOCK:
+        if len(_MISSING_FILES) >= MAX_MISSING_FILES:
+            _MISSING_FILES.clear()
+        _MISSING_FILES[str(file_path)] = time.monotonic() + MISSING_FILE_TTL
+
+
+# Decoded content of recently read files: path -> (mtime_ns, size, content).
+# Only files small enough to skip streaming (STREAM_THRESHOLD) are kept, so
+# the cache is bounded to CONTENT_CACHE_SIZE such files
+CONTENT_CACHE_SIZE = 64
+_CONTENT_CACHE: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+_CONTENT_CACHE_LOCK = threading.Lock()
+
+
+def _cached_content(path: str, st: os.stat_result) -> Optional[str]:
+    """Return the cached content of path if the file is unchanged since it was cached."""
+    with _CONTENT_CACHE_LOCK:
+        cached = _CONTENT_CACHE.get(path)
+        if cached is None:
+            return None
+        if cached[0] != st.st_mtime_ns or cached[1] != st.st_size:
+            del _CONTENT_CACHE[path]
+            return None
+        _CONTENT_CACHE.move_to_end(path)
+        return cached[2]
+
+
+def _cache_content(path: str, st: os.stat_result, content: str):
+    """Remember a file's decoded content, evicting the least recently read file."""
+    with _CONTENT_CACHE_LOCK:
+        _CONTENT_CACHE[path] = (st.st_mtime_ns, st.st_size, content)
+        _CONTENT_CACHE.move_to_end(path)
+        if len(_CONTENT_CACHE) > CONTENT_CACHE_SIZE:
+            _CONTENT_CACHE.popitem(last=False)
+
+
+def _invalidate_file_caches(file_path: Path = None):
+    """
+    Drop what the file caches hold about file_path: its cached content,
+    its not-found entry and its parent directories' listings (all if None).
+    """
+    with _CONTENT_CACHE_LOCK:
+        if file_path is None:
+            _CONTENT_CACHE.clear()
+        else:
+            _CONTENT_CACHE.pop(str(file_path), None)
+    
+    with _MISSING_FILES_LOCK:
+        if file_path is None:
+            _MISSING_FILES.clear()
+        else:
+            _MISSING_FILES.pop(str(file_path), None)
+    
+    with _TREE_CACHE_LOCK:
+        if file_path is None:
+            _TREE_CACHE.clear()
+        else:
+            for parent in file_path.parents:
+                _TREE_CACHE.pop(str(parent), None)
+
+
+def _entry_nodes(current: Path, entries: tuple, offset: int = 0, limit: int = MAX_ENTRIES_PER_DIR,
+                 sort: bool = True):
+    """
+    Build file explorer nodes for one page of a scanned directory.
+    
+    Directories get 'children': None (not loaded), and 'link': True when
+    they are a symlink. If entries remain past the page, a 'truncated' node
+    with the total, the next offset and the sort order to page with is
+    appended.
+    """
+    # Relative path of this directory, computed once; children just append their name
+    current_str = str(current)
+    if current_str == _WS_STR:
+        rel_dir = ''
+    elif current_str.startswith(_WS_STR):
+        rel_dir = current_str[_WS_LEN:]
+    else:
+        rel_dir = str(current.relative_to(WORKSPACE_DIR))
+    prefix = rel_dir + os.sep if rel_dir else ''
+    
+    nodes = []
+    for name, is_dir, size, is_link in entries[offset:offset + limit]:
+        if is_dir:
+            nodes.append({
+                'name': name,
+                'type': 'directory',
+                'path': prefix + name,
+                'link': is_link,
+                'children': None
+            })
+        else:
+            nodes.append({
+                'name': name,
+                'type': 'file',
+                'path': prefix + name,
+                'size': size
+            })
+    
+    end = offset + limit
+    if end < len(entries):
+        nodes.append({
+            'name': f'{len(entries) - end} more...',
+            'type': 'truncated',
+            'path': rel_dir,
+            'total': len(entries),
+            'offset': end,
+            'sort': sort
+        })
+    
+    return nodes
+
+
+# Workers for listing the directories of one tree level concurrently. In
+# threading mode they are native threads and os.scandir releases the GIL around
+# readdir. Under eventlet they are green threads, so each hands its disk read
+# to eventlet's native thread pool (tpool) to actually overlap
+_TREE_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+def _scan_tree_dir(directory: Path, sort: bool, offload: bool = False):
+    """Scan one directory for get_file_tree; None if it can't be read."""
+    try:
+        return _scan_one_level(str(directory), directory.stat().st_mtime_ns, sort, offload)
     except PermissionError:
-        return []
+        return None
+
+
+def get_file_tree(directory: Path, max_depth=5, sort=True):
+    """
+    Get file tree structure for the file explorer.
+    
+    Directories below max_depth, and symlinked ones at any depth, are
+    returned with 'children': None, meaning not loaded yet; the client
+    fetches them on expand. Only the first MAX_ENTRIES_PER_DIR entries of
+    each directory are included. With sort=False entries keep the
+    filesystem order.
+    """
+    tree = []
+    
+    # Breadth-first, one level at a time: (directory, children list to fill).
+    # All directories of a level are scanned in parallel, so wall time follows
+    # the tree depth rather than the number of directories
+    level = [(directory, tree)]
+    for depth in range(max_depth):
+        if len(level) == 1:
+            results = [_scan_tree_dir(level[0][0], sort)]
+        else:
+            results = _TREE_POOL.map(lambda item: _scan_tree_dir(item[0], sort, True), level)
+        
+        next_level = []
+        for (current, children), entries in zip(level, results):
+            if entries is None:
+                continue
+            
+            nodes = _entry_nodes(current, entries, sort=sort)
+            children.extend(nodes)
+            
+            if depth + 1 < max_depth:
+                for node in nodes:
+                    if node['type'] == 'directory' and not node['link']:
+                        node['children'] = []
+                        next_level.append((current / node['name'], node['children']))
+        
+        if not next_level:
+            break
+        level = next_level
+    
+    return tree
+
+
+# Extension -> editor language, built once at import time (read-only view)
+_LANGUAGE_MAP = types.MappingProxyType({
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.jsx': 'javascript',
+    '.tsx': 'typescript',
+    '.html': 'html',
+    '.css': 'css',
+    '.json': 'json',
+    '.md': 'markdown',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.sh': 'bash',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.c': 'c',
+})
+
+
+def _workspace_path(rel_path: str) -> Optional[Path]:
+    """
+    Map a client-supplied relative path into the workspace.
+    
+    Returns None if the path escapes the workspace, through '..', an absolute
+    path or a symlink pointing outside.
+    """
+    # normpath folds '..' lexically; the OS would apply it after following
+    # symlinks ('link/../..' climbs from the link's target), so the folded
+    # path is the one both checked and returned, and it may not climb out
+    norm = os.path.normpath(rel_path)
+    if Path(norm).anchor or norm == os.pardir or norm.startswith(os.pardir + os.sep):
+        return None
+    
+    file_path = WORKSPACE_DIR / norm
+    resolved = os.path.realpath(file_path)
+    if resolved != _WS_ROOT and not resolved.startswith(_WS_ROOT_PREFIX):
+        return None
+    return file_path
+
+
+def _detect_language(file_path: Path) -> str:
+    """Detect the editor language from the file extension."""
+    return _LANGUAGE_MAP.get(file_path.suffix.lower(), 'plaintext')
+
+
+# index.html only uses url_for, so it is rendered once: (body, etag)
+_INDEX_CACHE: Optional[Tuple[bytes, str]] = None
 
 
 @app.route('/')
 def index():
     """Serve the main IDE interface."""
-    return render_template('index.html')
+    global _INDEX_CACHE
+    if _INDEX_CACHE is None:
+        body = render_template('index.html').encode('utf-8')
+        _INDEX_CACHE = (body, hashlib.blake2b(body, digest_size=8).hexdigest())
+    body, etag = _INDEX_CACHE
+    
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+
+def _sort_arg() -> bool:
+    """Read the optional 'sort' query parameter (0/false/no turns sorting off)."""
+    return request.args.get('sort', '1').lower() not in ('0', 'false', 'no')
 
 
 @app.route('/api/workspace/files')
 def get_files():
-    """Get the file tree structure."""
+    """
+    Get the file tree structure.
+    
+    Optional query parameters:
+        path: Directory relative to the workspace to list (default: workspace root)
+        depth: Number of levels to return (default: 5)
+        sort: 0/false to skip sorting entries by name (default: 1)
+    """
     try:
-        tree = get_file_tree(WORKSPACE_DIR)
+        rel_path = request.args.get('path', '')
+        depth = request.args.get('depth', 5, type=int)
+        sort = _sort_arg()
+        
+        directory = _workspace_path(rel_path)
+        if directory is None:
+            return jsonify({
+                'success': False,
+                'error': 'Path is outside the workspace'
+            }), 400
+        
+        if not directory.is_dir():
+            return jsonify({
+                'success': False,
+                'error': 'Directory not found'
+            }), 404
+        
+        tree = get_file_tree(directory, depth, sort)
         return jsonify({
             'success': True,
             'workspace': str(WORKSPACE_DIR),
+            'path': rel_path,
             'tree': tree
         })
     except Exception as e:
@@ -94,21 +526,82 @@ def get_files():
         }), 500
 
 
+@app.route('/api/workspace/dir')
+def get_directory_page():
+    """
+    Get one page of a single directory's entries.
+    
+    Used by the file explorer to load directories larger than MAX_ENTRIES_PER_DIR.
+    
+    Query parameters:
+        path: Directory relative to the workspace (default: workspace root)
+        offset: Index of the first entry to return (default: 0)
+        limit: Maximum number of entries (default and cap: MAX_ENTRIES_PER_DIR)
+        sort: 0/false to page through filesystem order, as in a tree fetched
+            with sort=0 (default: 1)
+    """
+    try:
+        rel_path = request.args.get('path', '')
+        sort = _sort_arg()
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', MAX_ENTRIES_PER_DIR, type=int), 1), MAX_ENTRIES_PER_DIR)
+        
+        directory = _workspace_path(rel_path)
+        if directory is None:
+            return jsonify({
+                'success': False,
+                'error': 'Path is outside the workspace'
+            }), 400
+        
+        # One stat for the existence and type checks and the listing cache key
+        try:
+            st = os.stat(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            st = None
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            return jsonify({
+                'success': False,
+                'error': 'Directory not found'
+            }), 404
+        
+        entries = _scan_one_level(str(directory), st.st_mtime_ns, sort)
+        
+        return jsonify({
+            'success': True,
+            'path': rel_path,
+            'offset': offset,
+            'total': len(entries),
+            'entries': _entry_nodes(directory, entries, offset, limit, sort)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/workspace/set', methods=['POST'])
 def set_workspace():
     """Change the workspace directory."""
-    global WORKSPACE_DIR
+    global WORKSPACE_DIR, _WS_STR, _WS_LEN, _WS_ROOT, _WS_ROOT_PREFIX
     try:
-        data = request.json
-        new_path = Path(data.get('path'))
+        req, error = _decode_request(WorkspaceReq)
+        if error:
+            return error
+        new_path = Path(req.path)
         
-        if not new_path.exists() or not new_path.is_dir():
+        if not new_path.is_dir():
             return jsonify({
                 'success': False,
                 'error': 'Invalid directory path'
             }), 400
         
         WORKSPACE_DIR = new_path
+        _WS_STR = str(WORKSPACE_DIR)
+        _WS_LEN = len(os.path.join(_WS_STR, ''))
+        _WS_ROOT = os.path.realpath(WORKSPACE_DIR)
+        _WS_ROOT_PREFIX = os.path.join(_WS_ROOT, '')
+        _invalidate_file_caches()
         return jsonify({
             'success': True,
             'workspace': str(WORKSPACE_DIR)
@@ -120,65 +613,288 @@ def set_workspace():
         }), 500
 
 
+def _read_fd(fd: int, size: int) -> bytes:
+    """Read up to size bytes from an open file descriptor."""
+    data = os.read(fd, size)
+    if len(data) == size:
+        return data
+    
+    # Short read (signal, huge file) - keep reading until EOF
+    chunks = [data]
+    remaining = size - len(data)
+    while remaining > 0:
+        chunk = os.read(fd, remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+# Under eventlet, disk reads/writes never yield to the hub; large ones are
+# handed to eventlet's native thread pool so other requests keep being served
+OFFLOAD_IO_BYTES = 256 * 1024
+
+if ASYNC_MODE == 'eventlet':
+    from eventlet import tpool
+else:
+    tpool = None
+
+
+def _offload_io(size: int, fn, *args):
+    """Call fn(*args), on a native thread when running under eventlet and size is large."""
+    if tpool is None or size < OFFLOAD_IO_BYTES:
+        return fn(*args)
+    return tpool.execute(fn, *args)
+
+
+def _write_fd(fd: int, data: bytes):
+    """Write all of data to an open file descriptor."""
+    view = memoryview(data)
+    while view:
+        # os.write may write less than asked (signals, pipes) - retry the rest without copying
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _stream_file_response(file_path: Path, f, size: int):
+    """
+    Stream an open binary file as the /api/file/read JSON response.
+    
+    The content is decoded and JSON-escaped a chunk at a time, so the whole
+    file is never held as bytes, str and encoded JSON at once. Decoding is
+    strict: invalid UTF-8 in the first chunk is a 400 response, and past it
+    (once the 200 status is sent) the body ends with "success": false and
+    an error instead of substituted text. Takes ownership of f and closes it.
+    """
+    first_chunk = f.read(STREAM_CHUNK_SIZE)
+    
+    # Incremental decoder keeps multi-byte characters split across chunks intact
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    
+    # Reject binary files before any of the response has been sent
+    first_text = None
+    if b'\x00' not in first_chunk:
+        try:
+            first_text = decoder.decode(first_chunk)
+        except UnicodeDecodeError:
+            pass
+    if first_text is None:
+        f.close()
+        return jsonify({
+            'success': False,
+            'error': 'Binary file - cannot display'
+        }), 400
+    
+    # "success" goes last, after the content, so a decode error found
+    # mid-stream can still be reported
+    prelude = b'{"language":%s,"path":%s,"size":%d,"content":"' % (
+        orjson.dumps(_detect_language(file_path)),
+        orjson.dumps(str(file_path.relative_to(WORKSPACE_DIR))),
+        size
+    )
+    
+    def generate():
+        try:
+            yield prelude
+            yield orjson.dumps(first_text)[1:-1]
+            try:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                while chunk:
+                    yield orjson.dumps(decoder.decode(chunk))[1:-1]
+                    chunk = f.read(STREAM_CHUNK_SIZE)
+                yield orjson.dumps(decoder.decode(b'', final=True))[1:-1]
+            except UnicodeDecodeError:
+                yield b'","success":false,"error":"Binary file - cannot display"}'
+                return
+            yield b'","success":true}'
+        finally:
+            f.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
 @app.route('/api/file/read', methods=['POST'])
 def read_file():
     """Read file contents."""
     try:
-        data = request.json
-        file_path = WORKSPACE_DIR / data.get('path')
+        req, error = _decode_request(ReadReq)
+        if error:
+            return error
+        file_path = _workspace_path(req.path)
+        if file_path is None:
+            return jsonify({
+                'success': False,
+                'error': 'Path is outside the workspace'
+            }), 400
         
-        if not file_path.exists() or not file_path.is_file():
+        # A cache hit answers without re-arming the TTL, so the file shows up
+        # at most MISSING_FILE_TTL after it is created outside the IDE
+        if _is_known_missing(file_path):
             return jsonify({
                 'success': False,
                 'error': 'File not found'
             }), 404
         
-        # Check file size (limit to 10MB)
-        if file_path.stat().st_size > 10 * 1024 * 1024:
+        # One open + fstat replaces the separate exists/is_file/stat calls
+        try:
+            # O_NONBLOCK: opening a FIFO must not wait for a writer (regular files ignore it)
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0) | _OPEN_FLAGS)
+        except (FileNotFoundError, NotADirectoryError):
+            _remember_missing(file_path)
             return jsonify({
                 'success': False,
-                'error': 'File too large (max 10MB)'
-            }), 400
+                'error': 'File not found'
+            }), 404
         
-        # Try to read as text
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Detect language from extension
-            extension = file_path.suffix.lower()
-            language_map = {
-                '.py': 'python',
-                '.js': 'javascript',
-                '.ts': 'typescript',
-                '.jsx': 'javascript',
-                '.tsx': 'typescript',
-                '.html': 'html',
-                '.css': 'css',
-                '.json': 'json',
-                '.md': 'markdown',
-                '.yaml': 'yaml',
-                '.yml': 'yaml',
-                '.sh': 'bash',
-                '.go': 'go',
-                '.rs': 'rust',
-                '.java': 'java',
-                '.cpp': 'cpp',
-                '.c': 'c',
-            }
+            st = os.fstat(fd)
+            
+            if not stat.S_ISREG(st.st_mode):
+                return jsonify({
+                    'success': False,
+                    'error': 'File not found'
+                }), 404
+            
+            # Check file size (limit to 10MB)
+            if st.st_size > MAX_FILE_SIZE:
+                return jsonify({
+                    'success': False,
+                    'error': 'File too large (max 10MB)'
+                }), 400
+            
+            if st.st_size > STREAM_THRESHOLD:
+                # Large file - stream it instead of building the bytes, str and JSON copies
+                f = os.fdopen(fd, 'rb', buffering=1 << 20)
+                fd = None
+                return _stream_file_response(file_path, f, st.st_size)
             
+            # Re-opening an unchanged file is served from memory
+            content = _cached_content(str(file_path), st)
+            if content is None:
+                raw = _offload_io(st.st_size, _read_fd, fd, st.st_size)
+        finally:
+            if fd is not None:
+                os.close(fd)
+        
+        if content is None:
+            # Try to decode as text; a NUL near the start marks a binary file
+            # without paying for a full decode
+            if b'\x00' not in raw[:4096]:
+                try:
+                    content = raw.decode('utf-8')
+                except UnicodeDecodeError:
+                    pass
+            if content is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Binary file - cannot display'
+                }), 400
+            _cache_content(str(file_path), st, content)
+        
+        return jsonify({
+            'success': True,
+            'content': content,
+            'language': _detect_language(file_path),
+            'path': str(file_path.relative_to(WORKSPACE_DIR)),
+            'size': st.st_size
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/file/read_stream', methods=['POST'])
+def read_file_stream():
+    """
+    Stream file contents.
+    
+    Returns the same JSON as /api/file/read, but the content is always read
+    and escaped in chunks, whatever the file size.
+    """
+    try:
+        req, error = _decode_request(ReadReq)
+        if error:
+            return error
+        file_path = _workspace_path(req.path)
+        if file_path is None:
             return jsonify({
-                'success': True,
-                'content': content,
-                'language': language_map.get(extension, 'plaintext'),
-                'path': str(file_path.relative_to(WORKSPACE_DIR)),
-                'size': file_path.stat().st_size
-            })
-        except UnicodeDecodeError:
+                'success': False,
+                'error': 'Path is outside the workspace'
+            }), 400
+        
+        # One stat for the existence, type and size checks
+        try:
+            st = os.stat(file_path)
+        except (FileNotFoundError, NotADirectoryError):
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
             return jsonify({
                 'success': False,
-                'error': 'Binary file - cannot display'
+                'error': 'File not found'
+            }), 404
+        
+        size = st.st_size
+        if size > MAX_FILE_SIZE:
+            return jsonify({
+                'success': False,
+                'error': 'File too large (max 10MB)'
+            }), 400
+        
+        return _stream_file_response(file_path, open(file_path, 'rb', buffering=1 << 20), size)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# Extensions /api/file/raw shows inline (the client's RAW_FILE_EXTENSIONS).
+# Anything else, HTML and SVG included, is sent as a download, so workspace
+# content never runs as a page on the IDE's own origin
+_RAW_INLINE_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.bmp', '.pdf',
+    '.mp3', '.wav', '.ogg', '.mp4', '.webm', '.zip', '.woff', '.woff2', '.ttf'
+})
+
+
+@app.route('/api/file/raw')
+def read_file_raw():
+    """
+    Serve a file's raw bytes, for images and other binary assets.
+    
+    The body is sent with sendfile when the WSGI server provides
+    wsgi.file_wrapper; conditional and Range requests are supported.
+    Only _RAW_INLINE_EXTENSIONS are served inline, always under a sandbox
+    CSP and nosniff. The editor language is returned in the X-Language
+    header, so text files can be loaded without the JSON envelope too.
+    
+    Query parameters:
+        path: File relative to the workspace
+    """
+    try:
+        rel_path = request.args.get('path', '')
+        file_path = _workspace_path(rel_path)
+        if file_path is None:
+            return jsonify({
+                'success': False,
+                'error': 'Path is outside the workspace'
             }), 400
+        
+        inline = file_path.suffix.lower() in _RAW_INLINE_EXTENSIONS
+        response = send_from_directory(WORKSPACE_DIR, rel_path, as_attachment=not inline,
+                                       conditional=True, etag=True, max_age=60)
+        response.headers['Content-Security-Policy'] = 'sandbox'
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers['X-Language'] = _detect_language(file_path)
+        return response
+    except NotFound:
+        return jsonify({
+            'success': False,
+            'error': 'File not found'
+        }), 404
     except Exception as e:
         return jsonify({
             'success': False,
@@ -186,19 +902,43 @@ def read_file():
         }), 500
 
 
+def _open_creating_parents(file_path: Path, flags: int) -> int:
+    """
+    Open file_path for writing, creating missing parent directories.
+    
+    The parents usually exist, so the open is tried first and makedirs
+    only runs (followed by a retry) when it fails with FileNotFoundError.
+    """
+    try:
+        return os.open(file_path, flags | _OPEN_FLAGS, 0o644)
+    except FileNotFoundError:
+        os.makedirs(file_path.parent, exist_ok=True)
+        return os.open(file_path, flags | _OPEN_FLAGS, 0o644)
+
+
 @app.route('/api/file/write', methods=['POST'])
 def write_file():
     """Write file contents."""
     try:
-        data = request.json
-        file_path = WORKSPACE_DIR / data.get('path')
-        content = data.get('content')
+        req, error = _decode_request(WriteReq)
+        if error:
+            return error
+        file_path = _workspace_path(req.path)
+        if file_path is None:
+            return jsonify({
+                'success': False,
+                'error': 'Path is outside the workspace'
+            }), 400
+        content = req.content
         
-        # Create parent directories if they don't exist
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        encoded = content.encode('utf-8')
+        fd = _open_creating_parents(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            _offload_io(len(encoded), _write_fd, fd, encoded)
+        finally:
+            os.close(fd)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        _invalidate_file_caches(file_path)
         
         return jsonify({
             'success': True,
@@ -215,20 +955,27 @@ def write_file():
 def create_file():
     """Create a new file."""
     try:
-        data = request.json
-        file_path = WORKSPACE_DIR / data.get('path')
+        req, error = _decode_request(CreateReq)
+        if error:
+            return error
+        file_path = _workspace_path(req.path)
+        if file_path is None:
+            return jsonify({
+                'success': False,
+                'error': 'Path is outside the workspace'
+            }), 400
         
-        if file_path.exists():
+        # Create the empty file; O_EXCL makes the existence check and creation one atomic syscall
+        try:
+            fd = _open_creating_parents(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
             return jsonify({
                 'success': False,
                 'error': 'File already exists'
             }), 400
+        os.close(fd)
         
-        # Create parent directories
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Create empty file
-        file_path.touch()
+        _invalidate_file_caches(file_path)
         
         return jsonify({
             'success': True,
@@ -245,8 +992,8 @@ def create_file():
 def test_stt():
     """Test endpoint to check which STT is configured."""
     try:
-        from tools.stt_tool import create_stt_tool
-        stt_tool = create_stt_tool()
+        # The pipeline's STT tool, so its client is built once and shared
+        stt_tool = _get_pipeline()['stt_tool']
         
         # Test with dummy text
         result = stt_tool.call("test text")
@@ -289,11 +1036,167 @@ def get_observability_data():
         }), 500
 
 
+# Coder results for recently seen (plan, language, existing code), so repeating a
+# command over an unchanged editor skips the LLM: key -> (expiry, AgentResult)
+CODEGEN_CACHE_SIZE = 512
+CODEGEN_CACHE_TTL = 15 * 60
+_CODEGEN_CACHE: "OrderedDict[bytes, Tuple[float, AgentResult]]" = OrderedDict()
+_CODEGEN_CACHE_LOCK = threading.Lock()
+
+
+def _codegen_key(plan: Dict, coder_context: Dict) -> bytes:
+    """Hash everything the code generation prompt is built from."""
+    return hashlib.blake2b(orjson.dumps([
+        plan.get('command', ''),
+        plan.get('steps', []),
+        coder_context.get('language', 'python'),
+        coder_context.get('existing_code', '')
+    ]), digest_size=16).digest()
+
+
+def _cached_codegen(key: bytes) -> Optional[AgentResult]:
+    """Return the cached coder result for key, unless it has expired."""
+    with _CODEGEN_CACHE_LOCK:
+        cached = _CODEGEN_CACHE.get(key)
+        if cached is None:
+            return None
+        if cached[0] < time.monotonic():
+            del _CODEGEN_CACHE[key]
+            return None
+        _CODEGEN_CACHE.move_to_end(key)
+        return cached[1]
+
+
+def _cache_codegen(key: bytes, result: AgentResult):
+    """Remember a successful coder result for CODEGEN_CACHE_TTL seconds."""
+    with _CODEGEN_CACHE_LOCK:
+        _CODEGEN_CACHE[key] = (time.monotonic() + CODEGEN_CACHE_TTL, result)
+        _CODEGEN_CACHE.move_to_end(key)
+        if len(_CODEGEN_CACHE) > CODEGEN_CACHE_SIZE:
+            _CODEGEN_CACHE.popitem(last=False)
+
+# Agents and tools for the voice pipeline, built once and shared across commands
+_PIPELINE: Optional[Dict] = None
+_PIPELINE_LOCK = threading.Lock()
+
+# Set once the connect-time warm-up has been started (see handle_connect)
+_PREWARM_STARTED = False
+
+
+def _get_pipeline() -> Dict:
+    """
+    Get or create the shared agents and tools for the voice pipeline.
+    
+    The agents keep no per-request state (only their tool list), so a single
+    set can serve every command instead of re-creating agents and API clients.
+    """
+    global _PIPELINE
+    if _PIPELINE is None:
+        with _PIPELINE_LOCK:
+            if _PIPELINE is None:
+                stt_tool = create_stt_tool()
+                sanitizer_tool = SanitizerTool()
+                # One Gemini tool (stateless apart from its client) serves both LLM stages
+                llm_tool = GeminiLLMTool()
+                
+                _PIPELINE = {
+                    'speech_agent': SpeechAgent().add_tool(stt_tool),
+                    'security_agent': SecurityAgent().add_tool(sanitizer_tool),
+                    'reasoning_agent': ReasoningAgent().add_tool(llm_tool),
+                    'coder_agent': CoderAgent().add_tool(llm_tool),
+                    'stt_tool': stt_tool,
+                    'sanitizer_tool': sanitizer_tool,
+                    'llm_tool': llm_tool
+                }
+    return _PIPELINE
+
+
+def _prewarm_pipeline():
+    """Build the pipeline and set up its API clients ahead of the first command."""
+    pipeline = _get_pipeline()
+    pipeline['stt_tool'].prewarm()
+    pipeline['llm_tool'].prewarm()
+
+
+def _decode_audio_b64(audio: str) -> bytes:
+    """
+    Decode base64 audio sent in a voice_command event (a data: URL prefix is allowed).
+    
+    binascii.a2b_base64 decodes in one C pass straight into an exactly sized
+    bytes object, so there are no intermediate buffers to fill or copy.
+    """
+    if audio.startswith('data:'):
+        audio = audio[audio.index(',') + 1:]
+    return binascii.a2b_base64(audio)
+
+
+def _finish_pipeline_log(logger, sid: str):
+    """Write the pipeline's end and JSON log, then tell the client where they are."""
+    try:
+        logger.log_pipeline_end(success=True)
+        json_log = logger.get_json_log_path()
+    except Exception:
+        traceback.print_exc()
+        json_log = None
+    
+    socketio.emit('pipeline_complete', {
+        'success': True,
+        'log_file': logger.get_log_file_path(),
+        'json_log': json_log
+    }, to=sid)
+
+
+class BatchEmitter:
+    """
+    Collects client events and sends them as one Socket.IO packet.
+    
+    Each queued (event, payload) becomes {'event': ..., 'data': ...} in the
+    list emitted by flush(); the client dispatches every entry to its own
+    handler. Used as a context manager, anything still queued is sent on exit.
+    """
+    
+    def __init__(self, event: str = 'pipeline_progress'):
+        self.event = event
+        self._events = []
+    
+    def queue(self, event: str, payload):
+        """Add an event to the next batch."""
+        self._events.append({'event': event, 'data': payload})
+    
+    def flush(self):
+        """Send the queued events, if any, in a single packet."""
+        if self._events:
+            emit(self.event, self._events)
+            self._events = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+
+# STT source or model -> label shown with the transcript
+_STT_DISPLAY = types.MappingProxyType({
+    'web_speech_api': '🌐 Web Speech API (Browser)',
+    'google_stt_enhanced': '☁️ Google Cloud STT (SOTA Enhanced)',
+})
+
+
 # WebSocket event handlers for voice interaction
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection."""
+    global _PREWARM_STARTED
     emit('status', {'message': 'Connected to Voice First IDE', 'type': 'success'})
+    
+    # The first client to connect warms the pipeline up while the user is
+    # still getting ready to speak, so the first command doesn't pay for it.
+    # Only once per process: later connects, even while it runs, skip it
+    if not _PREWARM_STARTED:
+        _PREWARM_STARTED = True
+        socketio.start_background_task(_prewarm_pipeline)
 
 
 @socketio.on('voice_command')
@@ -301,240 +1204,305 @@ def handle_voice_command(data):
     """Process voice command through the agent pipeline."""
     tracker = get_tracker()
     
-    try:
-        # Get the audio data or text input
-        audio_data = data.get('audio')  # base64 encoded audio
-        text_input = data.get('text')  # or direct text input
-        context = data.get('context', {})
-        
-        # Initialize logging
-        reset_logger()
-        logger = get_logger()
-        logger.log_pipeline_start(text_input if text_input else "Voice input")
-        
-        # Start observability tracking
-        query = text_input if text_input else "Voice input"
-        tracker.start_tracking(query)
-        
-        # Emit status update
-        emit('agent_status', {
-            'stage': 'speech',
-            'agent': 'Speech Agent',
-            'status': 'processing',
-            'message': 'Transcribing voice input...'
-        })
-        
-        # Stage 1: Speech to Text
-        tracker.track_agent_start('Speech Agent', 'speech')
-        speech_agent = SpeechAgent()
-        stt_tool = create_stt_tool()
-        speech_agent.add_tool(stt_tool)
-        
-        # Use text input directly if provided (for testing), otherwise process audio
-        if text_input:
-            transcript = text_input
-            speech_result = type('obj', (object,), {
-                'success': True,
-                'data': transcript,
-                'metadata': {'source': 'web_speech_api'}
-            })()
-        else:
-            speech_result = speech_agent.execute(audio_data, context)
-            if not speech_result.success:
-                tracker.track_agent_end('Speech Agent', 'speech', [stt_tool.name], 0, False)
-                tracker.end_tracking(success=False, error=speech_result.error)
-                emit('agent_error', {
-                    'stage': 'speech',
-                    'error': speech_result.error
+    # Client events are queued and sent together as one 'pipeline_progress'
+    # packet at each stage boundary instead of one packet per update
+    with BatchEmitter() as progress:
+        try:
+            # Get the audio data or text input
+            audio_data = data.get('audio')  # raw audio bytes (or base64 encoded audio)
+            text_input = data.get('text')  # or direct text input
+            context = data.get('context', {})
+            pipeline = _get_pipeline()
+            
+            # Initialize logging
+            reset_logger()
+            logger = get_logger()
+            logger.log_pipeline_start(text_input if text_input else "Voice input")
+            
+            # Start observability tracking
+            query = text_input if text_input else "Voice input"
+            tracker.start_tracking(query)
+            
+            # Emit status update
+            progress.queue('agent_status', {
+                'stage': 'speech',
+                'agent': 'Speech Agent',
+                'status': 'processing',
+                'message': 'Transcribing voice input...'
+            })
+            
+            # Stage 1: Speech to Text
+            tracker.track_agent_start('Speech Agent', 'speech')
+            speech_agent = pipeline['speech_agent']
+            stt_tool = pipeline['stt_tool']
+            
+            # Use text input directly if provided (for testing), otherwise process audio
+            if text_input:
+                transcript = text_input
+                speech_result = AgentResult(
+                    success=True,
+                    data=transcript,
+                    metadata={'source': 'web_speech_api'}
+                )
+            else:
+                if isinstance(audio_data, str):
+                    # Base64 audio from the JSON event - decode once; binary frames arrive as bytes already
+                    audio_data = _decode_audio_b64(audio_data)
+                progress.flush()
+                speech_result = speech_agent.execute(audio_data, context)
+                if not speech_result.success:
+                    tracker.track_agent_end('Speech Agent', 'speech', [stt_tool.name], 0, False)
+                    tracker.end_tracking(success=False, error=speech_result.error)
+                    progress.queue('agent_error', {
+                        'stage': 'speech',
+                        'error': speech_result.error
+                    })
+                    return
+                transcript = speech_result.data
+            
+            # Track speech agent completion
+            tracker.track_tool_usage(stt_tool.name, audio_data or text_input, transcript, 0, 0)
+            tracker.track_agent_end('Speech Agent', 'speech', [stt_tool.name], 0, True)
+            
+            # Send transcript to client with STT source info
+            stt_source = speech_result.metadata.get('source', 'unknown')
+            stt_model = speech_result.metadata.get('model', '')
+            
+            progress.queue('transcript', {
+                'text': transcript,
+                'source': stt_source,
+                'model': stt_model
+            })
+            
+            # Show which STT was used
+            stt_display = _STT_DISPLAY.get(stt_source) or _STT_DISPLAY.get(stt_model) or '🎤 Speech processed'
+            
+            progress.queue('agent_status', {
+                'stage': 'speech',
+                'agent': 'Speech Agent',
+                'status': 'completed',
+                'message': f'Transcribed: "{transcript}"<br><small>{stt_display}</small>'
+            })
+            
+            # Stage 2: Security validation
+            tracker.track_agent_start('Security Agent', 'security')
+            progress.queue('agent_status', {
+                'stage': 'security',
+                'agent': 'Security Agent',
+                'status': 'processing',
+                'message': 'Validating command safety...'
+            })
+            
+            security_agent = pipeline['security_agent']
+            sanitizer_tool = pipeline['sanitizer_tool']
+            security_result = security_agent.execute(transcript, context)
+            
+            if not security_result.success:
+                tracker.track_agent_end('Security Agent', 'security', [sanitizer_tool.name], 0, False)
+                tracker.end_tracking(success=False, error=security_result.error)
+                progress.queue('agent_error', {
+                    'stage': 'security',
+                    'error': security_result.error
                 })
                 return
-            transcript = speech_result.data
-        
-        # Track speech agent completion
-        tracker.track_tool_usage(stt_tool.name, audio_data or text_input, transcript, 0, 0)
-        tracker.track_agent_end('Speech Agent', 'speech', [stt_tool.name], 0, True)
-        
-        # Send transcript to client with STT source info
-        stt_source = speech_result.metadata.get('source', 'unknown')
-        stt_model = speech_result.metadata.get('model', '')
-        
-        emit('transcript', {
-            'text': transcript,
-            'source': stt_source,
-            'model': stt_model
-        })
-        
-        # Show which STT was used
-        stt_display = ''
-        if stt_source == 'web_speech_api':
-            stt_display = '🌐 Web Speech API (Browser)'
-        elif stt_source == 'google_stt_enhanced' or stt_model == 'google_stt_enhanced':
-            stt_display = '☁️ Google Cloud STT (SOTA Enhanced)'
-        else:
-            stt_display = '🎤 Speech processed'
-        
-        emit('agent_status', {
-            'stage': 'speech',
-            'agent': 'Speech Agent',
-            'status': 'completed',
-            'message': f'Transcribed: "{transcript}"<br><small>{stt_display}</small>'
-        })
-        
-        # Stage 2: Security validation
-        tracker.track_agent_start('Security Agent', 'security')
-        emit('agent_status', {
-            'stage': 'security',
-            'agent': 'Security Agent',
-            'status': 'processing',
-            'message': 'Validating command safety...'
-        })
-        
-        security_agent = SecurityAgent()
-        sanitizer_tool = SanitizerTool()
-        security_agent.add_tool(sanitizer_tool)
-        security_result = security_agent.execute(transcript, context)
-        
-        if not security_result.success:
-            tracker.track_agent_end('Security Agent', 'security', [sanitizer_tool.name], 0, False)
-            tracker.end_tracking(success=False, error=security_result.error)
-            emit('agent_error', {
+            
+            sanitized_command = security_result.data
+            tracker.track_tool_usage(sanitizer_tool.name, transcript, sanitized_command, 0, 0)
+            tracker.track_agent_end('Security Agent', 'security', [sanitizer_tool.name], 0, True)
+            progress.queue('agent_status', {
                 'stage': 'security',
-                'error': security_result.error
+                'agent': 'Security Agent',
+                'status': 'completed',
+                'message': 'Command validated and sanitized'
             })
-            return
-        
-        sanitized_command = security_result.data
-        tracker.track_tool_usage(sanitizer_tool.name, transcript, sanitized_command, 0, 0)
-        tracker.track_agent_end('Security Agent', 'security', [sanitizer_tool.name], 0, True)
-        emit('agent_status', {
-            'stage': 'security',
-            'agent': 'Security Agent',
-            'status': 'completed',
-            'message': 'Command validated and sanitized'
-        })
-        
-        # Stage 3: Planning
-        tracker.track_agent_start('Reasoning Agent', 'reasoning')
-        emit('agent_status', {
-            'stage': 'reasoning',
-            'agent': 'Reasoning Agent',
-            'status': 'processing',
-            'message': 'Creating execution plan...'
-        })
-        
-        reasoning_agent = ReasoningAgent()
-        llm_tool_reasoning = GeminiLLMTool()
-        reasoning_agent.add_tool(llm_tool_reasoning)
-        reasoning_result = reasoning_agent.execute(sanitized_command, context)
-        
-        if not reasoning_result.success:
-            tracker.track_agent_end('Reasoning Agent', 'reasoning', [llm_tool_reasoning.name], 0, False)
-            tracker.end_tracking(success=False, error=reasoning_result.error)
-            emit('agent_error', {
+            
+            # Stage 3: Planning
+            tracker.track_agent_start('Reasoning Agent', 'reasoning')
+            progress.queue('agent_status', {
                 'stage': 'reasoning',
-                'error': reasoning_result.error
+                'agent': 'Reasoning Agent',
+                'status': 'processing',
+                'message': 'Creating execution plan...'
             })
-            return
-        
-        plan = reasoning_result.data
-        # Track reasoning tokens (estimate from plan size)
-        reasoning_tokens = len(str(plan)) // 4
-        tracker.track_tool_usage(llm_tool_reasoning.name, sanitized_command, plan, reasoning_tokens, 0)
-        tracker.track_agent_end('Reasoning Agent', 'reasoning', [llm_tool_reasoning.name], reasoning_tokens, True)
-        emit('agent_status', {
-            'stage': 'reasoning',
-            'agent': 'Reasoning Agent',
-            'status': 'completed',
-            'message': f'Plan created with {plan["step_count"]} steps',
-            'data': plan
-        })
-        
-        # Stage 4: Code Generation
-        tracker.track_agent_start('Coder Agent', 'coding')
-        emit('agent_status', {
-            'stage': 'coding',
-            'agent': 'Coder Agent',
-            'status': 'processing',
-            'message': 'Generating code...'
-        })
-        
-        coder_agent = CoderAgent()
-        llm_tool_coder = GeminiLLMTool()
-        coder_agent.add_tool(llm_tool_coder)
-        
-        # Add file context if available
-        if context.get('current_file'):
-            coder_context = {
-                'language': context.get('language', 'python'),
-                'existing_code': context.get('file_content', ''),
-                'file_path': context.get('current_file')
-            }
-        else:
-            coder_context = {'language': context.get('language', 'python')}
-        
-        coder_result = coder_agent.execute(plan, coder_context)
-        
-        if not coder_result.success:
-            tracker.track_agent_end('Coder Agent', 'coding', [llm_tool_coder.name], 0, False)
-            tracker.end_tracking(success=False, error=coder_result.error)
-            emit('agent_error', {
+            
+            reasoning_agent = pipeline['reasoning_agent']
+            llm_tool_reasoning = pipeline['llm_tool']
+            
+            progress.flush()
+            reasoning_result = reasoning_agent.execute(sanitized_command, context)
+            
+            if not reasoning_result.success:
+                tracker.track_agent_end('Reasoning Agent', 'reasoning', [llm_tool_reasoning.name], 0, False)
+                tracker.end_tracking(success=False, error=reasoning_result.error)
+                progress.queue('agent_error', {
+                    'stage': 'reasoning',
+                    'error': reasoning_result.error
+                })
+                return
+            
+            plan = reasoning_result.data
+            # Track reasoning tokens (reported by the LLM tool, or estimated by the agent)
+            reasoning_tokens = plan['token_estimate']
+            tracker.track_tool_usage(llm_tool_reasoning.name, sanitized_command, plan, reasoning_tokens, 0)
+            tracker.track_agent_end('Reasoning Agent', 'reasoning', [llm_tool_reasoning.name], reasoning_tokens, True)
+            progress.queue('agent_status', {
+                'stage': 'reasoning',
+                'agent': 'Reasoning Agent',
+                'status': 'completed',
+                'message': f'Plan created with {plan["step_count"]} steps',
+                'data': plan
+            })
+            
+            # Stage 4: Code Generation
+            tracker.track_agent_start('Coder Agent', 'coding')
+            progress.queue('agent_status', {
                 'stage': 'coding',
-                'error': coder_result.error
+                'agent': 'Coder Agent',
+                'status': 'processing',
+                'message': 'Generating code...'
             })
-            return
-        
-        code_data = coder_result.data
-        # Track coder tokens (estimate from code size)
-        coder_tokens = len(code_data['code']) // 4
-        tracker.track_tool_usage(llm_tool_coder.name, plan, code_data['code'], coder_tokens, 0)
-        tracker.track_agent_end('Coder Agent', 'coding', [llm_tool_coder.name], coder_tokens, True)
-        emit('agent_status', {
-            'stage': 'coding',
-            'agent': 'Coder Agent',
-            'status': 'completed',
-            'message': f'Code generated ({len(code_data["code"])} characters)'
-        })
-        
-        # Send the generated code back
-        emit('code_generated', {
-            'code': code_data['code'],
-            'language': code_data.get('language', 'python'),
-            'command': code_data.get('command', ''),
-            'plan': plan
+            
+            coder_agent = pipeline['coder_agent']
+            llm_tool_coder = pipeline['llm_tool']
+            
+            # Add file context if available
+            if context.get('current_file'):
+                coder_context = {
+                    'language': context.get('language', 'python'),
+                    'existing_code': context.get('file_content', ''),
+                    'file_path': context.get('current_file')
+                }
+            else:
+                coder_context = {'language': context.get('language', 'python')}
+            
+            def on_token(text):
+                # Forward each LLM chunk as soon as it arrives, then yield to other handlers
+                emit('code_chunk', {'t': text})
+                socketio.sleep(0)
+            
+            coder_context['on_token'] = on_token
+            progress.flush()
+            
+            # Same plan over the same editor state: reuse the earlier result
+            # (the client can send context.no_cache to force a fresh generation)
+            codegen_key = None if context.get('no_cache') else _codegen_key(plan, coder_context)
+            coder_result = _cached_codegen(codegen_key) if codegen_key else None
+            codegen_cached = coder_result is not None
+            if not codegen_cached:
+                coder_result = coder_agent.execute(plan, coder_context)
+                if coder_result.success and codegen_key:
+                    _cache_codegen(codegen_key, coder_result)
+            
+            if not coder_result.success:
+                tracker.track_agent_end('Coder Agent', 'coding', [llm_tool_coder.name], 0, False)
+                tracker.end_tracking(success=False, error=coder_result.error)
+                progress.queue('agent_error', {
+                    'stage': 'coding',
+                    'error': coder_result.error
+                })
+                return
+            
+            code_data = coder_result.data
+            # Track coder tokens (reported by the LLM tool, else estimated from code size; none if cached)
+            if codegen_cached:
+                coder_tokens = 0
+            else:
+                coder_tokens = coder_result.metadata.get('tokens') or len(code_data['code']) // 4
+            tracker.track_tool_usage(llm_tool_coder.name, plan, code_data['code'], coder_tokens, 0)
+            tracker.track_agent_end('Coder Agent', 'coding', [llm_tool_coder.name], coder_tokens, True)
+            progress.queue('agent_status', {
+                'stage': 'coding',
+                'agent': 'Coder Agent',
+                'status': 'completed',
+                'message': f'Code generated ({len(code_data["code"])} characters{", cached" if codegen_cached else ""})'
+            })
+            
+            # Send the generated code back
+            progress.queue('code_generated', {
+                'code': code_data['code'],
+                'language': code_data.get('language', 'python'),
+                'command': code_data.get('command', '')
+            })
+            
+            progress.flush()
+            
+            # Log completion off the request path; 'pipeline_complete' is sent
+            # from there, once the JSON log it points to has been written
+            socketio.start_background_task(_finish_pipeline_log, logger, request.sid)
+            
+            # End observability tracking
+            tracker.end_tracking(success=True)
+            
+        except Exception as e:
+            # End tracking with error
+            tracker.end_tracking(success=False, error=str(e))
+            
+            progress.queue('agent_error', {
+                'stage': 'unknown',
+                'error': str(e)
+            })
+            traceback.print_exc()
+
+
+# Raw audio received through 'voice_audio' binary frames, per client session.
+# Frames are PCM16 @ 16kHz mono (e.g. 640 bytes per 20ms), capped at one minute.
+# The buffer grows with the recording and is dropped once the command is sent,
+# so idle connections hold no audio memory. None marks a recording that went
+# over the cap; it is rejected at 'voice_audio_end' rather than sent truncated.
+_AUDIO_BUFFERS: Dict[str, Optional[bytearray]] = {}
+MAX_AUDIO_BYTES = 16000 * 2 * 60
+
+
+@socketio.on('voice_audio')
+def handle_voice_audio(data: bytes):
+    """Append a binary audio frame to this client's buffer (no base64/JSON decoding)."""
+    if not isinstance(data, (bytes, bytearray)):
+        emit('agent_error', {
+            'stage': 'speech',
+            'error': 'Audio frames must be sent as binary data'
         })
-        
-        # Log completion
-        logger.log_pipeline_end(success=True)
-        
-        # End observability tracking
-        tracker.end_tracking(success=True)
-        
-        emit('pipeline_complete', {
-            'success': True,
-            'log_file': logger.get_log_file_path(),
-            'json_log': logger.get_json_log_path()
+        return
+    
+    buffer = _AUDIO_BUFFERS.setdefault(request.sid, bytearray())
+    if buffer is None:
+        return  # already over the cap
+    if len(buffer) + len(data) > MAX_AUDIO_BYTES:
+        _AUDIO_BUFFERS[request.sid] = None
+        return
+    buffer += data
+
+
+@socketio.on('voice_audio_end')
+def handle_voice_audio_end(data=None):
+    """Run the voice pipeline on the audio collected from 'voice_audio' frames."""
+    audio = _AUDIO_BUFFERS.pop(request.sid, b'')
+    context = (data or {}).get('context', {})
+    
+    if audio is None:
+        emit('agent_error', {
+            'stage': 'speech',
+            'error': f'Recording too long (max {MAX_AUDIO_BYTES // (16000 * 2)} seconds)'
         })
-        
-    except Exception as e:
-        # End tracking with error
-        tracker.end_tracking(success=False, error=str(e))
-        
+        return
+    
+    if not audio:
         emit('agent_error', {
-            'stage': 'unknown',
-            'error': str(e)
+            'stage': 'speech',
+            'error': 'No audio received'
         })
-        import traceback
-        traceback.print_exc()
+        return
+    
+    handle_voice_command({'audio': bytes(audio), 'context': context})
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
+    _AUDIO_BUFFERS.pop(request.sid, None)
     print('Client disconnected')
 
 
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get('PORT', 8081))
     print("🎙️ Voice First IDE Starting...")
     print(f"📁 Workspace: {WORKSPACE_DIR}")